@@ -4,6 +4,22 @@ Revision ID: 06babc3c066f
 Revises: ca2310e2a69a
 Create Date: 2026-02-08
 
+Production notes:
+- On PostgreSQL 11+, adding a NOT NULL column with a constant server_default is a
+  metadata-only change: existing rows are served the default from pg_attribute,
+  so there is no table rewrite and the ACCESS EXCLUSIVE lock is held only briefly.
+- We keep the server defaults instead of dropping them right after the add.
+  Dropping them would be a second ALTER (and a second ACCESS EXCLUSIVE lock) on
+  `tasks` for no durability benefit. If you ever want them gone, do it in a
+  separate migration during a maintenance window.
+- `lock_timeout` makes a blocked ALTER fail fast instead of queueing every
+  writer behind it while it waits for the lock. It is SET LOCAL: `upgrade
+  head` runs every revision on one connection, and a session-level setting
+  would leak into later revisions (e.g. cut short CREATE INDEX CONCURRENTLY
+  builds waiting on old transactions).
+- Databases that ran the earlier version of this revision had the defaults
+  dropped; migration 8c4f2a6b1d93 restores them so all environments match
+  the model.
 """
 from typing import Sequence, Union
 
@@ -19,12 +35,11 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    op.add_column("tasks", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
-    op.add_column("tasks", sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"))
+    op.execute("SET LOCAL lock_timeout = '2s'")
 
-    # optional: remove server defaults after backfill (keeps schema cleaner)
-    op.alter_column("tasks", "attempts", server_default=None)
-    op.alter_column("tasks", "max_attempts", server_default=None)
+    with op.batch_alter_table("tasks") as batch_op:
+        batch_op.add_column(sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"))
 
 
 def downgrade() -> None:
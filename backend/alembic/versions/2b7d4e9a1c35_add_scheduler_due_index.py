@@ -0,0 +1,45 @@
+"""add scheduler due index
+
+Revision ID: 2b7d4e9a1c35
+Revises: 863c3453fc7c
+Create Date: 2026-10-15
+
+Why this migration exists:
+- The scheduler claims `status='scheduled' AND scheduled_for <= now()
+  ORDER BY scheduled_for LIMIT n` every tick.
+- A partial index on `scheduled_for` covering only scheduled rows turns that
+  into an index range scan over runnable tasks, independent of how many
+  completed/failed/cancelled rows the table holds.
+
+Production notes:
+- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so it runs
+  in an autocommit block and does not block writers.
+- The index is dropped (CONCURRENTLY, IF EXISTS) before it is built, so an
+  INVALID index left by an interrupted build is rebuilt rather than silently
+  kept by `IF NOT EXISTS` (the scheduler would fall back to sequential scans).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2b7d4e9a1c35"
+down_revision: Union[str, None] = "863c3453fc7c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_due")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_tasks_due "
+            "ON tasks (scheduled_for) WHERE status = 'scheduled'"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_due")
@@ -0,0 +1,49 @@
+"""key the task list index on (created_at, id)
+
+Revision ID: 3d9b6e1f0a47
+Revises: 5f1a8c3d7e20
+Create Date: 2026-10-15
+
+Why this migration exists:
+- `GET /tasks` now pages by keyset: `WHERE (created_at, id) < (:c, :id)
+  ORDER BY created_at DESC, id DESC LIMIT n`. `id` breaks ties between tasks
+  created in the same instant so the cursor is unambiguous.
+- `ix_tasks_created` only covers `created_at`, so Postgres would sort each
+  tie group; `(created_at DESC, id DESC)` matches the query exactly and makes
+  every page an index range scan of `n` rows regardless of depth.
+
+Production notes:
+- The new index is built CONCURRENTLY before the old one is dropped
+  CONCURRENTLY; the list query is never without an index and writers are
+  not blocked.
+- Any `ix_tasks_created_at_id` left INVALID by an interrupted build is dropped
+  first and rebuilt; `IF NOT EXISTS` alone would accept it and the old index
+  would then be dropped with no usable replacement.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3d9b6e1f0a47"
+down_revision: Union[str, None] = "5f1a8c3d7e20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_created_at_id")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_tasks_created_at_id "
+            "ON tasks (created_at DESC, id DESC)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_created")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_created ON tasks (created_at DESC)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_created_at_id")
@@ -0,0 +1,38 @@
+"""drop the single-column status index
+
+Revision ID: 5f1a8c3d7e20
+Revises: 2b7d4e9a1c35
+Create Date: 2026-10-15
+
+Why this migration exists:
+- `ix_tasks_status` is a single-column index on a six-value enum. Once most
+  rows are terminal it is too unselective for the planner to use well, yet
+  every status transition still has to maintain it.
+- No query needs a status index: the worker's status predicates are all
+  alongside a primary-key lookup, and the scheduler's due-task scan and
+  next-due probe are served by the partial `ix_tasks_due`.
+
+Production notes:
+- Dropped CONCURRENTLY, so writers are not blocked.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5f1a8c3d7e20"
+down_revision: Union[str, None] = "2b7d4e9a1c35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_status")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_status ON tasks (status)")
@@ -0,0 +1,54 @@
+"""add task list indexes
+
+Revision ID: 863c3453fc7c
+Revises: 9e3c5fb6c1d7
+Create Date: 2026-10-15
+
+Why this migration exists:
+- `GET /tasks` orders by `created_at DESC` and optionally filters by
+  `parent_task_id`. Without a supporting index Postgres scans + sorts the whole
+  table for every page.
+- `ix_tasks_created` serves the unfiltered list; `ix_tasks_parent_created`
+  serves the chain filter. Both match the query's sort order, so a page is an
+  index range scan that stops after `limit` rows.
+
+Production notes:
+- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so both
+  statements run in an autocommit block and do not block writers.
+- Each index is dropped (CONCURRENTLY, IF EXISTS) before it is built: an
+  interrupted build leaves an INVALID index that `IF NOT EXISTS` would
+  silently keep, so a re-run must rebuild it.
+- No INCLUDE columns: list responses need the full row, so index-only scans
+  are not possible and extra payload would only bloat the index.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "863c3453fc7c"
+down_revision: Union[str, None] = "9e3c5fb6c1d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_created")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_tasks_created "
+            "ON tasks (created_at DESC)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_parent_created")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_tasks_parent_created "
+            "ON tasks (parent_task_id, created_at DESC)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_parent_created")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_created")
@@ -0,0 +1,44 @@
+"""restore retry column server defaults
+
+Revision ID: 8c4f2a6b1d93
+Revises: 3d9b6e1f0a47
+Create Date: 2026-10-15
+
+Why this migration exists:
+- Migration 06babc3c066f originally dropped the server defaults of
+  `attempts`/`max_attempts` right after adding the columns; it now keeps
+  them, and the model declares `server_default="0"`/`"3"`.
+- Databases that already ran the old version still have no defaults, so they
+  differ from fresh databases and from the model. Setting the defaults again
+  converges both (SET DEFAULT is idempotent, so fresh databases are unaffected).
+
+Production notes:
+- SET DEFAULT is metadata-only (no table rewrite, no scan), but it still takes
+  a brief ACCESS EXCLUSIVE lock; `lock_timeout` makes it fail fast instead of
+  queueing writers behind it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c4f2a6b1d93"
+down_revision: Union[str, None] = "3d9b6e1f0a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("SET LOCAL lock_timeout = '2s'")
+    op.execute(
+        "ALTER TABLE tasks "
+        "ALTER COLUMN attempts SET DEFAULT 0, "
+        "ALTER COLUMN max_attempts SET DEFAULT 3"
+    )
+
+
+def downgrade() -> None:
+    # No-op: fresh databases had these defaults from 06babc3c066f already.
+    pass
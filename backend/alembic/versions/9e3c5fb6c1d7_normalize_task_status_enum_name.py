@@ -8,11 +8,28 @@ Why this migration exists:
 - Older environments may use enum type name `taskstatus`.
 - Current model code expects enum type name `task_status`.
 - We normalize to `task_status` and ensure `cancelled` value exists.
+
+Production notes:
+- The naive fix (`ALTER COLUMN status TYPE task_status USING ...`) rewrites the
+  whole `tasks` table under an ACCESS EXCLUSIVE lock, blocking every writer for
+  the duration of the rewrite.
+- Instead we use expand/contract:
+    1) add a nullable `status_new task_status` column (metadata-only) and a
+       trigger that keeps it in sync for rows written during the migration
+    2) backfill it in small batches, committing between batches
+    3) prove NOT NULL with a NOT VALID check + VALIDATE (does not block writes)
+    4) build the replacement index CONCURRENTLY
+    5) swap the columns in one short transaction, then drop the legacy type
+- The ALTERs run with `lock_timeout` so a blocked ALTER fails fast rather
+  than queueing writers behind it. The CONCURRENTLY index build runs without
+  it: it must wait for every older transaction to finish, and a timeout there
+  would only leave an INVALID index behind on every attempt.
 """
 
 from typing import Sequence, Union
 
 from alembic import op
+import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = "9e3c5fb6c1d7"
@@ -20,53 +37,151 @@ down_revision: Union[str, None] = "7670f727fabd"
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# Rows rewritten per backfill transaction. Small enough to keep each
+# transaction (and its row locks) short on a busy table.
+BACKFILL_BATCH_SIZE = 10_000
+
+
+def _type_exists(bind, typname: str) -> bool:
+    return bind.execute(
+        sa.text("SELECT 1 FROM pg_type WHERE typname = :typname"),
+        {"typname": typname},
+    ).first() is not None
+
+
+def _constraint_exists(bind, conname: str) -> bool:
+    return bind.execute(
+        sa.text(
+            """
+            SELECT 1
+            FROM pg_constraint
+            WHERE conrelid = 'tasks'::regclass
+              AND conname = :conname
+            """
+        ),
+        {"conname": conname},
+    ).first() is not None
+
+
+def _status_column_type(bind) -> str | None:
+    return bind.execute(
+        sa.text(
+            """
+            SELECT t.typname
+            FROM pg_attribute a
+            JOIN pg_class c ON c.oid = a.attrelid
+            JOIN pg_type t ON t.oid = a.atttypid
+            WHERE c.relname = 'tasks'
+              AND a.attname = 'status'
+              AND NOT a.attisdropped
+            """
+        )
+    ).scalar()
+
+
+def _move_status_column_to_task_status(bind) -> None:
+    """
+    Move tasks.status from `taskstatus` to `task_status` without a table rewrite.
+
+    Runs outside the migration transaction so each backfill batch commits on
+    its own; multi-statement strings below execute as one implicit transaction.
+
+    Re-runnable: every step commits separately, so a fail-fast abort (e.g. the
+    swap hitting lock_timeout) leaves earlier steps applied. Each step is
+    written to be repeated: the check constraint is only added if missing, and
+    the index is dropped first so a build left INVALID by an aborted attempt
+    is never kept (IF NOT EXISTS alone would keep it and step 5 would rename
+    it into place).
+    """
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '3s'")
+        op.execute("SET statement_timeout = 0")
+
+        # Must be committed before any row can be cast to it.
+        op.execute("ALTER TYPE task_status ADD VALUE IF NOT EXISTS 'cancelled'")
+
+        # 1) Expand: new column + sync trigger for concurrent writers.
+        op.execute(
+            """
+            ALTER TABLE tasks ADD COLUMN IF NOT EXISTS status_new task_status;
+
+            CREATE OR REPLACE FUNCTION tasks_sync_status_new() RETURNS trigger AS $$
+            BEGIN
+                NEW.status_new := NEW.status::text::task_status;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS tasks_sync_status_new ON tasks;
+            CREATE TRIGGER tasks_sync_status_new
+                BEFORE INSERT OR UPDATE OF status ON tasks
+                FOR EACH ROW EXECUTE FUNCTION tasks_sync_status_new();
+            """
+        )
+
+        # 2) Backfill in batches; each UPDATE commits on its own.
+        backfill = sa.text(
+            f"""
+            UPDATE tasks
+            SET status_new = status::text::task_status
+            WHERE ctid = ANY(ARRAY(
+                SELECT ctid FROM tasks
+                WHERE status_new IS NULL
+                LIMIT {BACKFILL_BATCH_SIZE}
+            ))
+            """
+        )
+        while bind.execute(backfill).rowcount:
+            pass
+
+        # 3) NOT NULL proof without holding an exclusive lock during the scan.
+        if not _constraint_exists(bind, "tasks_status_new_not_null"):
+            op.execute(
+                "ALTER TABLE tasks ADD CONSTRAINT tasks_status_new_not_null "
+                "CHECK (status_new IS NOT NULL) NOT VALID"
+            )
+        op.execute("ALTER TABLE tasks VALIDATE CONSTRAINT tasks_status_new_not_null")
+
+        # 4) Replacement for ix_tasks_status, built without blocking writes.
+        # No lock_timeout: the build waits out older transactions by design.
+        op.execute("RESET lock_timeout")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_status_new")
+        op.execute("CREATE INDEX CONCURRENTLY ix_tasks_status_new ON tasks (status_new)")
+
+        # 5) Contract: short swap. SET NOT NULL reuses the validated check (no scan).
+        op.execute(
+            """
+            SET LOCAL lock_timeout = '3s';
+            ALTER TABLE tasks ALTER COLUMN status_new SET NOT NULL;
+            DROP TRIGGER tasks_sync_status_new ON tasks;
+            DROP FUNCTION tasks_sync_status_new();
+            ALTER TABLE tasks DROP COLUMN status;
+            ALTER TABLE tasks RENAME COLUMN status_new TO status;
+            ALTER INDEX ix_tasks_status_new RENAME TO ix_tasks_status;
+            ALTER TABLE tasks DROP CONSTRAINT tasks_status_new_not_null;
+            """
+        )
+
+        op.execute("RESET statement_timeout")
+
 
 def upgrade() -> None:
-    op.execute(
-        """
-        DO $$
-        BEGIN
-            -- If both types exist, move tasks.status to task_status and drop taskstatus.
-            IF EXISTS (SELECT 1 FROM pg_type WHERE typname = 'taskstatus')
-               AND EXISTS (SELECT 1 FROM pg_type WHERE typname = 'task_status') THEN
-                IF EXISTS (
-                    SELECT 1
-                    FROM pg_attribute a
-                    JOIN pg_class c ON c.oid = a.attrelid
-                    JOIN pg_type t ON t.oid = a.atttypid
-                    WHERE c.relname = 'tasks'
-                      AND a.attname = 'status'
-                      AND t.typname = 'taskstatus'
-                ) THEN
-                    ALTER TABLE tasks
-                    ALTER COLUMN status TYPE task_status
-                    USING status::text::task_status;
-                END IF;
-
-                DROP TYPE IF EXISTS taskstatus;
-            END IF;
-
-            -- If only legacy taskstatus exists, rename it to task_status.
-            IF EXISTS (SELECT 1 FROM pg_type WHERE typname = 'taskstatus')
-               AND NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'task_status') THEN
-                ALTER TYPE taskstatus RENAME TO task_status;
-            END IF;
-
-            -- Ensure cancelled value exists on the normalized type.
-            IF EXISTS (SELECT 1 FROM pg_type WHERE typname = 'task_status')
-               AND NOT EXISTS (
-                    SELECT 1
-                    FROM pg_type t
-                    JOIN pg_enum e ON t.oid = e.enumtypid
-                    WHERE t.typname = 'task_status'
-                      AND e.enumlabel = 'cancelled'
-               ) THEN
-                ALTER TYPE task_status ADD VALUE 'cancelled';
-            END IF;
-        END
-        $$;
-        """
-    )
+    bind = op.get_bind()
+
+    # If both types exist, move tasks.status to task_status and drop taskstatus.
+    if _type_exists(bind, "taskstatus") and _type_exists(bind, "task_status"):
+        if _status_column_type(bind) == "taskstatus":
+            _move_status_column_to_task_status(bind)
+        op.execute("DROP TYPE IF EXISTS taskstatus")
+
+    # If only legacy taskstatus exists, rename it to task_status (metadata-only).
+    if _type_exists(bind, "taskstatus") and not _type_exists(bind, "task_status"):
+        op.execute("SET LOCAL lock_timeout = '3s'")
+        op.execute("ALTER TYPE taskstatus RENAME TO task_status")
+
+    # Ensure cancelled value exists on the normalized type.
+    if _type_exists(bind, "task_status"):
+        op.execute("ALTER TYPE task_status ADD VALUE IF NOT EXISTS 'cancelled'")
 
 
 def downgrade() -> None:
@@ -5,10 +5,10 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from uuid import UUID
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, text, tuple_
+from sqlalchemy.orm import Session, load_only
 
-from app.models import Task, TaskStatus
+from app.models import TERMINAL_STATUSES, Task, TaskStatus
 
 
 def _utcnow() -> datetime:
@@ -36,40 +36,121 @@ def _as_utc(dt: datetime | None) -> datetime | None:
     return dt.astimezone(timezone.utc)
 
 
-def _initial_status(scheduled_for: datetime | None) -> TaskStatus:
+def initial_status(scheduled_for: datetime | None) -> TaskStatus:
     """
     Determine initial status for a newly created task.
 
     Rule:
       - scheduled if scheduled_for is in the future
       - queued if scheduled_for is None or <= now
+
+    The single "due now" rule: the API calls it before inserting (to know
+    whether to enqueue) and _insert_task falls back to it. Naive datetimes
+    are treated as UTC (see _as_utc).
     """
-    now = _utcnow()
+    scheduled_for = _as_utc(scheduled_for)
     if scheduled_for is None:
         return TaskStatus.queued
-    return TaskStatus.scheduled if scheduled_for > now else TaskStatus.queued
+    return TaskStatus.scheduled if scheduled_for > _utcnow() else TaskStatus.queued
+
+
+# Channel the scheduler LISTENs on; a NOTIFY wakes it to re-plan its sleep.
+TASKS_DUE_CHANNEL = "tasks_due"
+
+
+def _notify_scheduler(db: Session) -> None:
+    """
+    Tell the scheduler a scheduled task was added.
 
+    NOTIFY is transactional: it is delivered on COMMIT and dropped on rollback,
+    so the scheduler never wakes for a row it can't see yet. Postgres-only;
+    other dialects (SQLite in tests) have no scheduler to wake.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"NOTIFY {TASKS_DUE_CHANNEL}"))
+
+
+def _insert_task(
+    db: Session,
+    *,
+    name: str,
+    prompt: str,
+    scheduled_for: datetime | None,
+    status: TaskStatus | None,
+    parent_task_id: UUID | None = None,
+) -> Task:
+    """
+    Shared write path for create_task/create_chained_task.
 
-def create_task(db: Session, name: str, prompt: str, scheduled_for: datetime | None) -> Task:
+    INSERT ... RETURNING builds the Task straight from the returned row
+    (including server defaults like created_at), skipping the ORM unit-of-work
+    flush and any follow-up SELECT/refresh: one round-trip plus the COMMIT.
+    """
+    scheduled_for_utc = _as_utc(scheduled_for)
+    if status is None:
+        status = initial_status(scheduled_for_utc)
+
+    task = db.scalars(
+        insert(Task)
+        .values(
+            name=name,
+            prompt=prompt,
+            scheduled_for=scheduled_for_utc,
+            status=status,
+            parent_task_id=parent_task_id,
+        )
+        .returning(Task)
+    ).one()
+    if status == TaskStatus.scheduled:
+        _notify_scheduler(db)
+    db.commit()
+    return task
+
+
+def create_task(
+    db: Session,
+    name: str,
+    prompt: str,
+    scheduled_for: datetime | None,
+    status: TaskStatus | None = None,
+) -> Task:
     """
     Create a new task.
 
     Notes:
     - We normalize scheduled_for to UTC.
-    - We select initial status based on whether the task is due immediately.
+    - We select initial status based on whether the task is due immediately,
+      unless the caller already decided it (`status`, normally from
+      initial_status()), e.g. to branch on it without reading back the row.
+    - Future tasks NOTIFY the scheduler; due-now tasks are enqueued by the API.
+    - Written with a single INSERT ... RETURNING (see _insert_task).
     """
-    scheduled_for_utc = _as_utc(scheduled_for)
-
-    task = Task(
+    return _insert_task(
+        db,
         name=name,
         prompt=prompt,
-        scheduled_for=scheduled_for_utc,
-        status=_initial_status(scheduled_for_utc),
+        scheduled_for=scheduled_for,
+        status=status,
     )
-    db.add(task)
-    db.commit()
-    db.refresh(task)
-    return task
+
+
+# Columns served by list views (schemas.TaskSummaryOut). Leaves out the large
+# TEXT columns (prompt/output/error), which are usually TOASTed in Postgres.
+_SUMMARY_COLUMNS = (
+    Task.id,
+    Task.name,
+    Task.status,
+    Task.scheduled_for,
+    Task.created_at,
+    Task.started_at,
+    Task.finished_at,
+    Task.parent_task_id,
+    Task.llm_provider,
+    Task.llm_model,
+    Task.latency_ms,
+    Task.attempts,
+    Task.max_attempts,
+)
 
 
 def list_tasks(
@@ -77,6 +158,7 @@ def list_tasks(
     limit: int = 50,
     offset: int = 0,
     parent_task_id: UUID | None = None,
+    after: tuple[datetime, UUID] | None = None,
 ) -> list[Task]:
     """
     List tasks in reverse chronological order.
@@ -84,13 +166,31 @@ def list_tasks(
     Args:
       - limit/offset: basic pagination
       - parent_task_id: filter to a chain
+      - after: keyset cursor, the (created_at, id) of the last task of the
+        previous page. Preferred over offset: each page is an index range scan
+        of `limit` rows (ix_tasks_created_at_id) however deep it is, whereas
+        OFFSET reads and discards every skipped row.
+
+    id breaks created_at ties so the order (and therefore the cursor) is total.
+
+    Only summary columns are loaded (see _SUMMARY_COLUMNS); detail views use
+    get_task() for prompt/output. raiseload turns any accidental per-row load
+    of a deferred column (N+1) into an immediate error instead of a silent
+    extra SELECT per task; Task.parent is lazy="raise" on the model itself.
     """
-    stmt = select(Task)
+    stmt = select(Task).options(load_only(*_SUMMARY_COLUMNS, raiseload=True))
 
     if parent_task_id is not None:
         stmt = stmt.where(Task.parent_task_id == parent_task_id)
 
-    stmt = stmt.order_by(Task.created_at.desc()).limit(limit).offset(offset)
+    if after is not None:
+        stmt = stmt.where(tuple_(Task.created_at, Task.id) < tuple_(*after))
+
+    stmt = (
+        stmt.order_by(Task.created_at.desc(), Task.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
 
     return list(db.execute(stmt).scalars().all())
 
@@ -100,20 +200,9 @@ def get_task(db: Session, task_id) -> Task | None:
     return db.get(Task, task_id)
 
 
-def is_due(task: Task) -> bool:
-    """
-    Used by scheduler/queueing logic:
-      - only scheduled tasks can become due
-      - due if scheduled_for is None OR scheduled_for <= now (UTC)
-
-    Note: after our create_task() rules, scheduled_for=None will generally mean 'queued',
-    but we keep the None check for safety/backwards compatibility.
-    """
-    if task.status != TaskStatus.scheduled:
-        return False
-    if task.scheduled_for is None:
-        return True
-    return _as_utc(task.scheduled_for) <= _utcnow()
+# Fixed framing around a parent's output in a chained task's prompt.
+_CHAIN_PROMPT_HEAD = "Parent output:\n<<<\n"
+_CHAIN_PROMPT_MIDDLE = "\n>>>\n\nInstruction:\n"
 
 
 def create_chained_task(
@@ -122,35 +211,32 @@ def create_chained_task(
     name: str,
     instruction: str,
     scheduled_for: datetime | None,
+    status: TaskStatus | None = None,
 ) -> Task:
     """
     Create a new task whose prompt is derived from a parent task's output.
 
+    `status` works as in create_task: pass it when the caller already decided.
+    Same single INSERT ... RETURNING write path as create_task.
+
     Production note:
     - In real systems you may want stricter prompt formatting, truncation,
       or separate 'input' fields instead of concatenating strings.
     """
-    prompt = (
-        "Parent output:\n"
-        "<<<\n"
-        f"{parent.output}\n"
-        ">>>\n\n"
-        f"Instruction:\n{instruction}\n"
+    # One join over fixed literals: a single allocation sized for the result,
+    # no format-spec parsing over the (potentially large) parent output.
+    prompt = "".join(
+        (_CHAIN_PROMPT_HEAD, parent.output or "", _CHAIN_PROMPT_MIDDLE, instruction, "\n")
     )
 
-    scheduled_for_utc = _as_utc(scheduled_for)
-
-    task = Task(
+    return _insert_task(
+        db,
         name=name,
         prompt=prompt,
-        scheduled_for=scheduled_for_utc,
-        status=_initial_status(scheduled_for_utc),
+        scheduled_for=scheduled_for,
+        status=status,
         parent_task_id=parent.id,
     )
-    db.add(task)
-    db.commit()
-    db.refresh(task)
-    return task
 
 
 def cancel_task(db: Session, task_id) -> Task | None:
@@ -172,7 +258,7 @@ def cancel_task(db: Session, task_id) -> Task | None:
         return None
 
     # Terminal states: do nothing (idempotent cancel endpoint behavior)
-    if task.status in (TaskStatus.completed, TaskStatus.failed, TaskStatus.cancelled):
+    if task.status in TERMINAL_STATUSES:
         return task
 
     # Mark as cancelled and close out if not already finished.
@@ -180,5 +266,4 @@ def cancel_task(db: Session, task_id) -> Task | None:
     task.finished_at = task.finished_at or _utcnow()
 
     db.commit()
-    db.refresh(task)
     return task
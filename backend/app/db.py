@@ -6,12 +6,35 @@ from sqlalchemy.orm import sessionmaker
 from app.settings import settings
 from app.models import Base  # noqa: F401
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+# Connection pool sizing. The defaults (5 + 10 overflow) queue concurrent API
+# requests behind each other; this is sized for a single API/worker process.
+POOL_SIZE = 20
+MAX_OVERFLOW = 40
+
+# pool_pre_ping checks each connection on checkout (a cheap ping) and
+# transparently replaces dead ones, so a Postgres restart or failover doesn't
+# fail one request per pooled connection. pool_recycle retires connections by
+# age. TCP keepalives only detect a silently vanished peer, and only after
+# minutes of idle probing; they are not a substitute for the checkout ping.
+# LIFO hands out the most recently used connection, keeping a warm core and
+# letting idle surplus connections age out.
+engine = create_engine(
+    settings.database_url,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    pool_use_lifo=True,
+    connect_args={"keepalives": 1, "keepalives_idle": 30},
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
 def get_db():
-    db = SessionLocal()
+    # API sessions live for one request, so there is nothing stale to protect
+    # against by expiring on commit; keeping attributes loaded lets handlers
+    # return just-committed rows without an extra SELECT per object.
+    db = SessionLocal(expire_on_commit=False)
     try:
         yield db
     finally:
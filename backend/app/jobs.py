@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Optional
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
-from sqlalchemy import func, update
+from rq import Queue
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
 from app.db import SessionLocal
@@ -15,51 +18,116 @@ from app.models import Task, TaskStatus
 from app.worker import queue
 
 
+# How many streamed chunks to consume between cancellation checks.
+CANCEL_CHECK_EVERY_CHUNKS = 32
+
+
+@dataclass(frozen=True, slots=True)
+class TaskResult:
+    """
+    Final state one execute_task run wrote for its task.
+
+    Built from values the run already holds (no read-back SELECT). Unset
+    fields are None: e.g. a cancelled run records no output or metadata.
+    """
+
+    task_id: UUID
+    status: TaskStatus
+    attempts: int
+    output: str | None = None
+    error: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    llm_provider: str | None = None
+    llm_model: str | None = None
+    latency_ms: int | None = None
+
+
 def _utcnow() -> datetime:
     """Return a timezone-aware UTC timestamp."""
     return datetime.now(timezone.utc)
 
 
-def execute_task(task_id: str) -> None:
+def _is_cancelled(db: Session, task_pk: UUID) -> bool:
+    """Read just the status column; end the read transaction right away."""
+    status = db.execute(select(Task.status).where(Task.id == task_pk)).scalar_one_or_none()
+    db.rollback()
+    return status == TaskStatus.cancelled
+
+
+def _generate(db: Session, task_pk: UUID, llm, prompt: str) -> str:
+    """
+    Run the model call.
+
+    Clients exposing `stream()` are consumed incrementally so a cancellation
+    stops the provider call within CANCEL_CHECK_EVERY_CHUNKS chunks (closing the
+    stream closes the HTTP response). Other clients fall back to `generate()`.
+    """
+    stream = getattr(llm, "stream", None)
+    if stream is None:
+        return llm.generate(prompt)
+
+    parts: list[str] = []
+    chunks = stream(prompt)
+    try:
+        for i, part in enumerate(chunks, start=1):
+            parts.append(part)
+            if i % CANCEL_CHECK_EVERY_CHUNKS == 0 and _is_cancelled(db, task_pk):
+                break
+    finally:
+        chunks.close()
+    return "".join(parts)
+
+
+def _llm_metadata(llm) -> tuple[str, str | None]:
+    """(provider, model) to persist for a run: client class name and `model` attribute."""
+    return llm.__class__.__name__, getattr(llm, "model", None)
+
+
+def execute_task(
+    task_id: str,
+    *,
+    session_factory: Callable[[], Session] | None = None,
+    llm_factory: Callable[[], object] | None = None,
+) -> TaskResult | None:
     """
     RQ worker entrypoint: execute a task and persist output + metadata.
 
+    Returns the TaskResult this run wrote, or None if it did nothing (invalid
+    id, task not claimable). The DB remains the source of truth; the return
+    value just spares callers (tests, direct invocations) a read-back.
+
+    RQ calls this with just `task_id`. `session_factory`/`llm_factory` default
+    to SessionLocal/get_llm_client (resolved per call) and exist so callers
+    such as tests can inject their own instead of patching module globals.
+
     Key properties:
-    - Idempotent: safe to run multiple times (will no-op for terminal states).
+    - Idempotent: safe to run multiple times. The atomic claim below only
+      succeeds from `queued`, so scheduled (not yet due), running, and terminal
+      tasks are no-ops.
     - Best-effort cancellation:
-        * If a task is cancelled before execution begins, we do nothing.
-        * If cancelled while running, we cannot forcibly stop the LLM call
-          (unless the LLM client supports cancellation). We therefore:
-            - check for cancellation right before starting
-            - check again right after generation
-            - if cancelled, we record finished_at and do NOT overwrite status
-              to completed, and we do NOT retry.
+        * If a task is cancelled before execution begins, the claim fails and we do nothing.
+        * If cancelled while running, streaming clients stop within
+          CANCEL_CHECK_EVERY_CHUNKS chunks; blocking clients can't be
+          interrupted. Either way we only persist success while the row is
+          still `running`; if it was cancelled meanwhile we record finished_at
+          and do NOT overwrite status to completed, and we do NOT retry.
     - Retry behavior:
         * Uses Task.attempts and Task.max_attempts
         * Re-enqueues only if task is not cancelled and attempts < max_attempts
+    - Round-trips: one UPDATE...RETURNING to claim, one conditional UPDATE to
+      finish. No SELECT/refresh of the full row (prompt/output are large TEXT).
     """
     try:
         task_pk = UUID(str(task_id))
     except (TypeError, ValueError):
-        return
+        return None
 
-    db: Session = SessionLocal()
+    db: Session = (session_factory or SessionLocal)()
     try:
-        task: Optional[Task] = db.get(Task, task_pk)
-        if not task:
-            return
-
-        # Terminal states are idempotent: do nothing.
-        if task.status in (TaskStatus.completed, TaskStatus.failed, TaskStatus.cancelled):
-            return
-
-        # If a task is still scheduled (future), the scheduler should enqueue it later.
-        # If it ended up here anyway, treat it as a no-op to avoid early execution.
-        if task.status == TaskStatus.scheduled:
-            return
-
         # Atomic claim: only one worker may transition queued -> running.
-        # This prevents duplicate execution if the same task is enqueued twice.
+        # This prevents duplicate execution if the same task is enqueued twice,
+        # and RETURNING hands us the prompt without a separate SELECT.
         claim_stmt = (
             update(Task)
             .where(Task.id == task_pk)
@@ -70,55 +138,83 @@ def execute_task(task_id: str) -> None:
                 error=None,
                 started_at=func.coalesce(Task.started_at, func.now()),
             )
-            .returning(Task.id)
+            .returning(Task.prompt, Task.attempts, Task.started_at)
         )
-        claimed = db.execute(claim_stmt).scalar_one_or_none()
+        claimed = db.execute(claim_stmt).one_or_none()
         if claimed is None:
             db.rollback()
-            return
+            return None
+        prompt, attempts, started_at = claimed
 
         db.commit()
-        task = db.get(Task, task_pk)
-        if not task:
-            return
-
-        # If the task was cancelled immediately after we set running,
-        # bail out without doing work.
-        if task.status == TaskStatus.cancelled:
-            task.finished_at = task.finished_at or _utcnow()
-            db.commit()
-            return
 
         # ----------------------------------------------------------------------
         # Execute the model call
         # ----------------------------------------------------------------------
+        llm = (llm_factory or get_llm_client)()
+        llm_provider, llm_model = _llm_metadata(llm)
+
+        # Latency from the monotonic clock (immune to wall-clock adjustments);
+        # finished_at derived from the same measurement so the two can't disagree.
         start_ts = _utcnow()
-        llm = get_llm_client()
-        text = llm.generate(task.prompt)
-        end_ts = _utcnow()
-        latency_ms = int((end_ts - start_ts).total_seconds() * 1000)
-
-        # Re-load to ensure we respect cancellations that occurred mid-run.
-        # (Separate transactions/processes could have updated status.)
-        db.refresh(task)
-
-        # If cancelled while the model was running, don't mark completed.
-        if task.status == TaskStatus.cancelled:
-            task.finished_at = task.finished_at or end_ts
-            db.commit()
-            return
+        start_mono = time.monotonic()
+        text = _generate(db, task_pk, llm, prompt)
+        elapsed = time.monotonic() - start_mono
+        end_ts = start_ts + timedelta(seconds=elapsed)
+        latency_ms = int(elapsed * 1000)
 
         # ----------------------------------------------------------------------
         # Persist success
         # ----------------------------------------------------------------------
-        task.output = text
-        task.error = None
-        task.llm_provider = llm.__class__.__name__
-        task.llm_model = getattr(llm, "model", None)
-        task.latency_ms = latency_ms
-        task.finished_at = end_ts
-        task.status = TaskStatus.completed
+        # Conditional on `running`: a cancellation that landed mid-run (separate
+        # transaction/process) makes this match zero rows instead of being
+        # overwritten, with no extra SELECT to check first.
+        finished = db.execute(
+            update(Task)
+            .where(Task.id == task_pk)
+            .where(Task.status == TaskStatus.running)
+            .values(
+                output=text,
+                error=None,
+                llm_provider=llm_provider,
+                llm_model=llm_model,
+                latency_ms=latency_ms,
+                finished_at=end_ts,
+                status=TaskStatus.completed,
+            )
+        )
+
+        if finished.rowcount:
+            db.commit()
+            return TaskResult(
+                task_id=task_pk,
+                status=TaskStatus.completed,
+                attempts=attempts,
+                output=text,
+                started_at=started_at,
+                finished_at=end_ts,
+                llm_provider=llm_provider,
+                llm_model=llm_model,
+                latency_ms=latency_ms,
+            )
+
+        # If cancelled while the model was running, don't mark completed;
+        # just close it out.
+        closed = db.execute(
+            update(Task)
+            .where(Task.id == task_pk)
+            .where(Task.status == TaskStatus.cancelled)
+            .where(Task.finished_at.is_(None))
+            .values(finished_at=end_ts)
+        )
         db.commit()
+        return TaskResult(
+            task_id=task_pk,
+            status=TaskStatus.cancelled,
+            attempts=attempts,
+            started_at=started_at,
+            finished_at=end_ts if closed.rowcount else None,
+        )
 
     except Exception as e:
         # Persist error + decide retry vs fail.
@@ -127,13 +223,20 @@ def execute_task(task_id: str) -> None:
         try:
             task = db.get(Task, task_pk)
             if not task:
-                return
+                return None
 
             # If cancelled at any point, do not retry and do not overwrite status.
             if task.status == TaskStatus.cancelled:
                 task.finished_at = task.finished_at or _utcnow()
+                result = TaskResult(
+                    task_id=task_pk,
+                    status=TaskStatus.cancelled,
+                    attempts=task.attempts,
+                    started_at=task.started_at,
+                    finished_at=task.finished_at,
+                )
                 db.commit()
-                return
+                return result
 
             task.error = str(e)
             task.finished_at = _utcnow()
@@ -141,16 +244,23 @@ def execute_task(task_id: str) -> None:
             max_attempts = task.max_attempts if task.max_attempts is not None else 3
             attempts = task.attempts if task.attempts is not None else 0
 
-            if attempts < max_attempts:
-                # Put back to queued and re-enqueue immediately.
-                # Note: if cancellation happens after this point, the next run will no-op.
-                task.status = TaskStatus.queued
-                db.commit()
-                db.refresh(task)
-                queue.enqueue(execute_task, str(task.id))
-            else:
-                task.status = TaskStatus.failed
-                db.commit()
+            # Put back to queued (and re-enqueue) or give up.
+            # Note: if cancellation happens after requeue, the next run will no-op.
+            retry = attempts < max_attempts
+            task.status = TaskStatus.queued if retry else TaskStatus.failed
+            # Captured before commit, which would expire the instance.
+            result = TaskResult(
+                task_id=task_pk,
+                status=task.status,
+                attempts=attempts,
+                error=task.error,
+                started_at=task.started_at,
+                finished_at=task.finished_at,
+            )
+            db.commit()
+            if retry:
+                enqueue_task_ids([str(task_pk)])
+            return result
 
         finally:
             # Swallow exception so RQ doesn't manage retries/status.
@@ -158,3 +268,21 @@ def execute_task(task_id: str) -> None:
 
     finally:
         db.close()
+
+
+def enqueue_task_ids(task_ids: Iterable[str]) -> None:
+    """
+    Enqueue `execute_task` for each task id.
+
+    Uses RQ's bulk API, which stages every job in one Redis pipeline
+    (MULTI/EXEC), so N tasks cost one Redis round-trip instead of N.
+    Callers must commit the task rows before enqueueing.
+
+    result_ttl=0: the DB is the source of truth, so RQ should not keep
+    execute_task's TaskResult (which can carry the full output) in Redis.
+    """
+    job_datas = [
+        Queue.prepare_data(execute_task, (task_id,), result_ttl=0) for task_id in task_ids
+    ]
+    if job_datas:
+        queue.enqueue_many(job_datas)
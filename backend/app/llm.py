@@ -2,42 +2,101 @@
 
 import random
 import time
+from collections.abc import Iterator
+from functools import lru_cache
+
 import httpx
+import orjson
 from app.settings import settings
 
 
 class MockLLMClient:
     model = "mock-llm"
+    latency_seconds = 1.0
 
     def generate(self, prompt: str) -> str:
-        time.sleep(1.0)
-        if random.random() < 0.03:    
+        time.sleep(self.latency_seconds)
+        # ~3% transient failures, independent per call so retries can succeed.
+        if random.random() < 0.03:
             raise RuntimeError("Mock LLM transient error")
         return f"[MOCK OUTPUT]\n\nPrompt:\n{prompt}\n\nResponse:\nThis is a mocked response."
 
 
+# Shared HTTP client for provider calls. Reusing it keeps TCP/TLS connections
+# alive across generations instead of paying a fresh handshake per task, and
+# HTTP/2 lets concurrent calls in one process multiplex over one connection.
+_HTTP = httpx.Client(
+    http2=True,
+    timeout=30.0,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+
+
 class OpenAILLMClient:
     def __init__(self, api_key: str, model: str):
         self.api_key = api_key
         self.model = model
 
-    def generate(self, prompt: str) -> str:
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield the completion incrementally as content deltas.
+
+        Uses the streaming (SSE) API so callers can act on partial output and stop
+        early; closing the generator closes the HTTP response.
+        """
         # TODO: move to constants.py
         url = "https://api.openai.com/v1/chat/completions"
-        headers = {"Authorization": f"Bearer {self.api_key}"}
-        payload = {"model": self.model, "messages": [{"role": "user", "content": prompt}]}
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+        }
 
-        with httpx.Client(timeout=30.0) as client:
-            r = client.post(url, headers=headers, json=payload)
+        # orjson (C) instead of stdlib json for large prompts/responses.
+        with _HTTP.stream("POST", url, headers=headers, content=orjson.dumps(payload)) as r:
             r.raise_for_status()
-            data = r.json()
-            return data["choices"][0]["message"]["content"]
+            for line in r.iter_lines():
+                # SSE frames look like `data: {...}`; blank lines separate events.
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                choices = orjson.loads(data).get("choices") or []
+                if not choices:
+                    continue
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
 
+    def generate(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
 
-def get_llm_client():
-     # TODO: move openai to constants.py
-    if settings.llm_provider.lower() == "openai":
+
+@lru_cache(maxsize=4)
+def _build_llm_client(provider: str, model: str):
+    # TODO: move openai to constants.py
+    if provider == "openai":
         if not settings.openai_api_key:
             raise RuntimeError("OPENAI_API_KEY required when LLM_PROVIDER=openai")
-        return OpenAILLMClient(settings.openai_api_key, settings.openai_model)
+        return OpenAILLMClient(settings.openai_api_key, model)
     return MockLLMClient()
+
+
+def get_llm_client():
+    """
+    Return the process-wide client for the configured provider/model.
+
+    Settings are read once at process start, so the client is built on first use
+    and reused by every task afterwards (keyed by provider+model).
+    """
+    return _build_llm_client(settings.llm_provider.lower(), settings.openai_model)
+
+
+def reset_llm_client() -> None:
+    """Drop cached clients, e.g. after tests change settings."""
+    _build_llm_client.cache_clear()
@@ -1,10 +1,15 @@
 # backend/app/main.py
 
+import base64
 import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
 from uuid import UUID
 
+import anyio.to_thread
 from fastapi import Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 from app.crud import (
@@ -12,15 +17,37 @@ from app.crud import (
     create_chained_task,
     create_task,
     get_task,
+    initial_status,
     list_tasks,
 )
-from app.db import get_db
-from app.jobs import execute_task
+from app.db import MAX_OVERFLOW, POOL_SIZE, get_db
+from app.jobs import enqueue_task_ids
 from app.models import TaskStatus
-from app.schemas import TaskChainCreate, TaskCreate, TaskOut, TaskRetryRequest
-from app.worker import queue
+from app.schemas import TaskChainCreate, TaskCreate, TaskOut, TaskRetryRequest, TaskSummaryOut
 
-app = FastAPI(title="Vinci4D Mini LLM Task Orchestrator")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Size the sync-handler threadpool to the DB pool.
+
+    Handlers are plain `def` (the session/crud layer is synchronous), so
+    FastAPI runs each one on AnyIO's worker threads, 40 by default. That cap
+    sat below the DB pool (POOL_SIZE + MAX_OVERFLOW), so requests queued for a
+    thread while connections sat idle. One thread per connection lets every
+    pooled connection serve a request concurrently.
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = POOL_SIZE + MAX_OVERFLOW
+    yield
+
+
+# ORJSONResponse encodes the response body in C (UUIDs/datetimes included)
+# instead of the stdlib json module.
+app = FastAPI(
+    title="Vinci4D Mini LLM Task Orchestrator",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # ------------------------------------------------------------------------------
 # CORS middleware
@@ -33,6 +60,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -55,7 +83,7 @@ def api_create_task(payload: TaskCreate, db: Session = Depends(get_db)):
     """
     Create a new task.
 
-    The CRUD layer decides the initial status:
+    Initial status:
       - queued    → run immediately
       - scheduled → picked up later by the scheduler
 
@@ -63,12 +91,15 @@ def api_create_task(payload: TaskCreate, db: Session = Depends(get_db)):
     - The API is responsible for enqueueing *immediate* tasks.
     - The scheduler is responsible for enqueueing *future* tasks.
     """
-    task = create_task(db, payload.name, payload.prompt, payload.scheduled_for)
+    # Decide the status up front: the INSERT writes it directly (one
+    # round-trip, one commit) and the enqueue branch reuses it.
+    status = initial_status(payload.scheduled_for)
+    task = create_task(db, payload.name, payload.prompt, payload.scheduled_for, status=status)
 
-    # If the task should run immediately, enqueue it now.
+    # If the task should run immediately, enqueue it now (after commit).
     # Scheduled tasks are handled by the scheduler process.
-    if task.status == TaskStatus.queued:
-        queue.enqueue(execute_task, str(task.id))
+    if status == TaskStatus.queued:
+        enqueue_task_ids([str(task.id)])
 
     return task
 
@@ -76,17 +107,63 @@ def api_create_task(payload: TaskCreate, db: Session = Depends(get_db)):
 # ------------------------------------------------------------------------------
 # List tasks
 # ------------------------------------------------------------------------------
-@app.get("/tasks", response_model=list[TaskOut])
+def _encode_cursor(task) -> str:
+    """Opaque keyset cursor for the page after `task`: base64 of created_at|id."""
+    raw = f"{task.created_at.isoformat()}|{task.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of _encode_cursor; 400 on anything malformed."""
+    try:
+        created_at, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(task_id)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor") from None
+
+
+# Field names of the list response, resolved once rather than per row.
+_SUMMARY_FIELDS = tuple(TaskSummaryOut.model_fields)
+
+
+@app.get("/tasks", response_model=list[TaskSummaryOut])
 def api_list_tasks(
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = None,
     parent_task_id: UUID | None = None,
     db: Session = Depends(get_db),
 ):
     """
     List tasks with optional pagination and chaining filter.
+
+    Returns summaries (no prompt/output/error); use GET /tasks/{id} for those.
+
+    Pagination: a full page sets the `X-Next-Cursor` response header; pass it
+    back as `cursor` for the next page. Cursor paging costs the same at any
+    depth; `offset` is kept for existing clients.
+
+    Rows come straight from the DB, so they are not re-validated:
+    model_construct() skips validators and the response is returned directly,
+    bypassing FastAPI's response_model validation + jsonable_encoder pass.
+    response_model still documents the shape in OpenAPI.
     """
-    return list_tasks(db, limit=limit, offset=offset, parent_task_id=parent_task_id)
+    after = _decode_cursor(cursor) if cursor else None
+    tasks = list_tasks(
+        db,
+        limit=limit,
+        offset=offset,
+        parent_task_id=parent_task_id,
+        after=after,
+    )
+    content = [
+        TaskSummaryOut.model_construct(
+            **{field: getattr(task, field) for field in _SUMMARY_FIELDS}
+        ).model_dump(mode="json")
+        for task in tasks
+    ]
+    headers = {"X-Next-Cursor": _encode_cursor(tasks[-1])} if len(tasks) == limit else None
+    return ORJSONResponse(content, headers=headers)
 
 
 # ------------------------------------------------------------------------------
@@ -122,17 +199,19 @@ def api_chain_task(task_id: uuid.UUID, payload: TaskChainCreate, db: Session = D
     if parent.status != TaskStatus.completed or not parent.output:
         raise HTTPException(409, "Parent task must be completed with output to chain")
 
+    # Same rule as create_task: status decided once, before the insert.
+    status = initial_status(payload.scheduled_for)
     child = create_chained_task(
         db=db,
         parent=parent,
         name=payload.name,
         instruction=payload.instruction,
         scheduled_for=payload.scheduled_for,
+        status=status,
     )
 
-    # Same enqueue rule as create_task
-    if child.status == TaskStatus.queued:
-        queue.enqueue(execute_task, str(child.id))
+    if status == TaskStatus.queued:
+        enqueue_task_ids([str(child.id)])
 
     return child
 
@@ -177,9 +256,8 @@ def api_retry_task(
     task.latency_ms = None
 
     db.commit()
-    db.refresh(task)
 
-    queue.enqueue(execute_task, str(task.id))
+    enqueue_task_ids([str(task.id)])
     return task
 
 
@@ -19,13 +19,56 @@ Production notes:
 from __future__ import annotations
 
 import enum
+import os
+import threading
+import time
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, ForeignKey, Integer, String, Text, func
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, String, Text, func, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
+# Last (timestamp_ms, 74-bit counter) handed out by uuid7(), per process.
+_uuid7_lock = threading.Lock()
+_uuid7_last = (0, 0)
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7).
+
+    Layout: 48-bit Unix timestamp in ms, then 74 random bits (version/variant
+    set per the RFC). New ids sort after older ones, so primary-key inserts land
+    on the right edge of the B-tree instead of a random leaf page.
+
+    Monotonic within a process (RFC 9562 section 6.2): an id generated in the
+    same millisecond as (or, after a clock step back, earlier than) the
+    previous one reuses its timestamp and increments the random bits, so ids
+    always sort in creation order. Keyset pagination relies on that to break
+    created_at ties.
+    """
+    global _uuid7_last
+    ts_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big") >> 6  # 74 bits
+    with _uuid7_lock:
+        last_ts, last_rand = _uuid7_last
+        if ts_ms <= last_ts:
+            ts_ms, rand = last_ts, last_rand + 1
+            if rand >> 74:  # counter overflow: borrow the next millisecond
+                ts_ms, rand = ts_ms + 1, 0
+        _uuid7_last = (ts_ms, rand)
+
+    value = (
+        (ts_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76  # version 7
+        | (rand >> 62) << 64  # rand_a (12 bits)
+        | 0x2 << 62  # RFC 4122 variant
+        | (rand & ((1 << 62) - 1))  # rand_b (62 bits)
+    )
+    return uuid.UUID(int=value)
+
+
 class Base(DeclarativeBase):
     """Base class for all ORM models."""
     pass
@@ -52,6 +95,13 @@ class TaskStatus(str, enum.Enum):
     cancelled = "cancelled"
 
 
+# States a task never leaves. frozenset membership is a hash lookup that
+# short-circuits on identity for enum members (vs. a linear tuple scan).
+TERMINAL_STATUSES: frozenset[TaskStatus] = frozenset(
+    {TaskStatus.completed, TaskStatus.failed, TaskStatus.cancelled}
+)
+
+
 class Task(Base):
     """
     Represents one unit of work to be executed by the worker.
@@ -59,7 +109,7 @@ class Task(Base):
     Columns overview:
     - id: UUID primary key.
     - name/prompt: display + instruction text.
-    - status: TaskStatus enum; indexed for scheduler/worker queries.
+    - status: TaskStatus enum; not indexed on its own (see migration 5f1a8c3d7e20).
     - scheduled_for: optional UTC timestamp for delayed execution.
     - created_at/started_at/finished_at: lifecycle timestamps.
     - output/error: execution result / error message.
@@ -70,14 +120,20 @@ class Task(Base):
 
     __tablename__ = "tasks"
 
+    # Fetch server-generated columns (created_at) in the INSERT's RETURNING clause
+    # instead of a follow-up SELECT when they are first accessed.
+    __mapper_args__ = {"eager_defaults": True}
+
     # Primary key: generated UUID for stable identifiers across services.
-    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    # UUIDv7 (time-ordered) keeps PK index inserts append-mostly; existing v4
+    # ids stay valid since both are plain 128-bit UUIDs.
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid7)
 
     # User-visible metadata.
     name: Mapped[str] = mapped_column(String(200))
     prompt: Mapped[str] = mapped_column(Text)
 
-    # Current state of the task. Indexed for efficient polling/scheduling queries.
+    # Current state of the task. Only the partial ix_tasks_due (below) covers it.
     #
     # IMPORTANT:
     # - We name the DB enum type explicitly (`task_status`) so Postgres has a stable type name.
@@ -91,7 +147,6 @@ class Task(Base):
             create_constraint=False,     # keep explicit, avoids surprise CHECK constraints
         ),
         default=TaskStatus.scheduled,
-        index=True,
     )
 
     # Scheduling + timestamps (timezone-aware).
@@ -111,15 +166,30 @@ class Task(Base):
     # Retry fields.
     # attempts: number of execution attempts already performed.
     # max_attempts: maximum number of attempts allowed before marking failed.
-    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
-    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    # server_default mirrors migrations 06babc3c066f/8c4f2a6b1d93 (DB-side defaults).
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3, server_default="3")
 
     # Task chaining support.
     # parent_task_id is a self-referential FK to tasks.id.
     parent_task_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("tasks.id"), nullable=True)
-    parent: Mapped["Task | None"] = relationship(remote_side="Task.id")
+    # lazy="raise": the API only exposes parent_task_id, so nothing should touch
+    # `parent` implicitly. A lazy load per row would be a silent N+1; callers
+    # that need the parent opt in with selectinload()/joinedload().
+    parent: Mapped["Task | None"] = relationship(remote_side="Task.id", lazy="raise")
 
     # LLM execution metadata (useful for observability and debugging).
     llm_provider: Mapped[str | None] = mapped_column(String(50), nullable=True)
     llm_model: Mapped[str | None] = mapped_column(String(100), nullable=True)
     latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+
+# List-view indexes (see migrations 863c3453fc7c and 3d9b6e1f0a47). Declared
+# here so autogenerate and test schemas (create_all) match what migrations
+# build in Postgres.
+Index("ix_tasks_created_at_id", Task.created_at.desc(), Task.id.desc())
+Index("ix_tasks_parent_created", Task.parent_task_id, Task.created_at.desc())
+
+# Scheduler claim index (see migration 2b7d4e9a1c35): only runnable rows, so
+# the due-task scan stays small no matter how many terminal tasks accumulate.
+Index("ix_tasks_due", Task.scheduled_for, postgresql_where=text("status = 'scheduled'"))
@@ -3,8 +3,9 @@
 Task scheduler process.
 
 Responsibility:
-- Periodically scan the DB for tasks in status=scheduled that are now "due"
-  (scheduled_for <= now).
+- Find tasks in status=scheduled that are now "due" (scheduled_for <= now).
+  Between ticks the scheduler sleeps until the earliest scheduled_for, and is
+  woken early by a Postgres NOTIFY on `tasks_due` when a task is scheduled.
 - Atomically "claim" those tasks by flipping scheduled -> queued.
 - Enqueue claimed task IDs onto the Redis queue so workers can execute them.
 
@@ -17,22 +18,37 @@ Key design goals:
 
 from __future__ import annotations
 
+import logging
+import logging.handlers
+import queue
 import random
+import sys
 import time
 from datetime import datetime, timezone
-from typing import Iterable, List
 
-from sqlalchemy import select
+import psycopg
+from sqlalchemy import func, make_url, select, update
 from sqlalchemy.exc import OperationalError, ProgrammingError
 
-from app.db import SessionLocal
-from app.jobs import execute_task
+from app.crud import TASKS_DUE_CHANNEL
+from app.db import engine
+from app.jobs import enqueue_task_ids
 from app.models import Task, TaskStatus
-from app.worker import queue
+from app.settings import settings
 
-# How often the scheduler wakes up to look for due tasks.
+# Retry delay after an unexpected error.
 POLL_SECONDS = 2
 
+# Longest the scheduler waits for a NOTIFY before re-checking anyway. Only a
+# safety net (e.g. a notification lost across a reconnect); normally it wakes
+# on NOTIFY or when the next scheduled_for arrives.
+POLL_SECONDS_MAX = 30
+
+# Shortest wait between ticks. Due rows locked by a concurrent scheduler are
+# skipped (SKIP LOCKED) but still count as "due now"; without a floor the loop
+# would re-check them in a tight spin until that scheduler commits.
+POLL_SECONDS_MIN = 0.25
+
 # Max tasks to claim in a single DB transaction. Keeps the scheduler lightweight.
 BATCH_SIZE = 10
 
@@ -40,12 +56,40 @@ BATCH_SIZE = 10
 DB_ERROR_BACKOFF_MIN_SECONDS = 1
 DB_ERROR_BACKOFF_MAX_SECONDS = 15
 
+# While draining a backlog, the "claimed+enqueued" line is summed and emitted
+# at most this often instead of once per tick.
+CLAIM_LOG_INTERVAL_SECONDS = 1.0
+
+logger = logging.getLogger("scheduler")
+
 
 def _utcnow() -> datetime:
     """Return timezone-aware UTC 'now'."""
     return datetime.now(timezone.utc)
 
 
+def _configure_logging() -> logging.handlers.QueueListener:
+    """
+    Route scheduler logs through an in-memory queue.
+
+    The loop only enqueues records (QueueHandler); a background
+    QueueListener thread does the actual stdout writes, so a slow or
+    back-pressured container log pipe never stalls a tick.
+    """
+    records: queue.Queue[logging.LogRecord] = queue.Queue(-1)
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(asctime)s [scheduler] %(levelname)s %(message)s"))
+
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(records, stream)
+    listener.start()
+    return listener
+
+
 def _sleep_with_jitter(seconds: float) -> None:
     """
     Sleep for `seconds` plus a small jitter to avoid thundering herd behavior
@@ -55,71 +99,119 @@ def _sleep_with_jitter(seconds: float) -> None:
     time.sleep(max(0.0, seconds + jitter))
 
 
+def _listen_connection() -> psycopg.Connection:
+    """
+    Open a dedicated autocommit connection LISTENing on TASKS_DUE_CHANNEL.
+
+    Kept outside the SQLAlchemy pool: it sits idle waiting for notifications
+    and must stay subscribed for the life of the loop.
+    """
+    url = make_url(settings.database_url).set(drivername="postgresql")
+    conn = psycopg.connect(url.render_as_string(hide_password=False), autocommit=True)
+    conn.execute(f"LISTEN {TASKS_DUE_CHANNEL}")
+    return conn
+
+
+def _seconds_until_next_due() -> float:
+    """
+    Seconds until the earliest scheduled task is due, clamped to
+    [POLL_SECONDS_MIN, POLL_SECONDS_MAX].
+
+    MIN(scheduled_for) over status='scheduled' is one probe of ix_tasks_due.
+    """
+    with engine.connect() as conn:
+        next_due = conn.execute(
+            select(func.min(Task.scheduled_for)).where(Task.status == TaskStatus.scheduled)
+        ).scalar()
+
+    if next_due is None:
+        return POLL_SECONDS_MAX
+    if next_due.tzinfo is None:
+        # Drivers without timestamptz support (SQLite) hand back naive UTC.
+        next_due = next_due.replace(tzinfo=timezone.utc)
+    return min(POLL_SECONDS_MAX, max(POLL_SECONDS_MIN, (next_due - _utcnow()).total_seconds()))
+
+
+def _wait_for_work(listen_conn: psycopg.Connection, timeout: float) -> None:
+    """
+    Block until a NOTIFY arrives or `timeout` elapses.
+
+    Notifications sent while we were busy are buffered on the connection, so
+    one that raced with the previous tick returns immediately.
+    """
+    for _ in listen_conn.notifies(timeout=timeout, stop_after=1):
+        pass
+
+
 def claim_and_enqueue_due_tasks() -> int:
     """
     One scheduler "tick".
 
     Steps:
-      1) Select up to BATCH_SIZE tasks:
+      1) In a single statement (a CTE feeding UPDATE ... FROM), pick up to
+         BATCH_SIZE tasks:
            - status = scheduled
            - scheduled_for IS NOT NULL
            - scheduled_for <= now
-         using FOR UPDATE SKIP LOCKED so multiple schedulers won't double-claim.
-      2) Flip each row to status=queued (claim).
-      3) Commit transaction (DB is the source of truth).
-      4) Enqueue jobs outside the transaction.
+         using FOR UPDATE SKIP LOCKED so multiple schedulers won't double-claim,
+         flip them to status=queued (claim), and RETURN their ids.
+      2) Commit transaction (DB is the source of truth); the whole claim is
+         one Core transaction on `engine`, with no ORM Session involved.
+      3) Enqueue jobs outside the transaction, in one Redis pipeline.
 
     Important notes:
     - We never enqueue before commit. If we crash between claim and enqueue,
       the task will be queued in DB but not in Redis. That's acceptable here and
       can be handled later by a "reconciler" (optional) that re-enqueues queued tasks
       that have no worker activity.
-    - Cancelled tasks are excluded by the WHERE clause; additionally, we do a
-      belt-and-suspenders check before updating.
+    - Cancelled tasks are excluded by the WHERE clause; the outer UPDATE repeats
+      the status check as belt-and-suspenders.
+    - The partial index ix_tasks_due (scheduled_for WHERE status='scheduled')
+      keeps the inner SELECT a bounded index range scan regardless of how many
+      terminal tasks the table holds.
     """
-    db = SessionLocal()
-    claimed_ids: List[str] = []
-
-    try:
-        now = _utcnow()
-
-        # Select a small batch of scheduled tasks that are due.
-        # FOR UPDATE SKIP LOCKED:
-        # - prevents two scheduler instances from claiming the same task
-        # - avoids deadlocks and allows horizontal scaling
-        stmt = (
-            select(Task)
-            .where(Task.status == TaskStatus.scheduled)
-            .where(Task.scheduled_for.is_not(None))
-            .where(Task.scheduled_for <= now)
-            .order_by(Task.scheduled_for.asc())
-            .with_for_update(skip_locked=True)
-            .limit(BATCH_SIZE)
-        )
-
-        tasks = list(db.execute(stmt).scalars().all())
-
-        for task in tasks:
-            # Defensive checks:
-            # - If someone cancelled it between select and update, don't claim.
-            # - If status changed for any reason, don't claim.
-            if task.status != TaskStatus.scheduled:
-                continue
-
-            # Claim: scheduled -> queued
-            task.status = TaskStatus.queued
-            claimed_ids.append(str(task.id))
-
-        # Commit the claim BEFORE enqueueing so we don't enqueue the same task twice.
-        db.commit()
-
-    finally:
-        db.close()
+    now = _utcnow()
+
+    # Select a small batch of scheduled tasks that are due.
+    # FOR UPDATE SKIP LOCKED:
+    # - prevents two scheduler instances from claiming the same task
+    # - avoids deadlocks and allows horizontal scaling
+    # MATERIALIZED pins the CTE as an optimization fence, so the LIMIT and
+    # row locks are evaluated exactly once rather than folded into the UPDATE.
+    due = (
+        select(Task.id)
+        .where(Task.status == TaskStatus.scheduled)
+        .where(Task.scheduled_for.is_not(None))
+        .where(Task.scheduled_for <= now)
+        .order_by(Task.scheduled_for.asc())
+        .limit(BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .cte("due")
+        .prefix_with("MATERIALIZED", dialect="postgresql")
+    )
+
+    # Claim: WITH due AS (...) UPDATE tasks ... FROM due RETURNING id --
+    # one statement, one round-trip.
+    claim_stmt = (
+        update(Task)
+        .where(Task.id == due.c.id)
+        .where(Task.status == TaskStatus.scheduled)
+        .values(status=TaskStatus.queued)
+        .returning(Task.id)
+    )
+
+    # A plain Core transaction: no Session, identity map or flush machinery.
+    # It commits when the block exits -- BEFORE enqueueing, so we don't
+    # enqueue the same task twice. The tick is exactly one statement, so its
+    # single snapshot is the same under READ COMMITTED as under REPEATABLE
+    # READ; the default level also lets SKIP LOCKED step over rows a
+    # concurrent cancel is updating instead of raising serialization errors.
+    with engine.begin() as conn:
+        claimed_ids = [str(task_id) for task_id in conn.execute(claim_stmt).scalars()]
 
     # Enqueue outside the DB transaction.
     # This avoids holding DB locks while talking to Redis.
-    for task_id in claimed_ids:
-        queue.enqueue(execute_task, task_id)
+    enqueue_task_ids(claimed_ids)
 
     return len(claimed_ids)
 
@@ -129,39 +221,71 @@ def main() -> None:
     Main scheduler loop.
 
     Production readiness improvements:
+    - Event-driven: waits on LISTEN tasks_due instead of polling on a fixed
+      interval, so an idle scheduler issues ~no queries and newly scheduled
+      tasks don't wait for the next poll.
     - Adds simple backoff for transient DB errors (OperationalError).
     - Avoids spamming errors for expected startup race conditions.
+    - Non-blocking logging; claim counts are summarized at most once per
+      CLAIM_LOG_INTERVAL_SECONDS while draining a backlog.
     """
+    listener = _configure_logging()
     backoff_seconds = DB_ERROR_BACKOFF_MIN_SECONDS
+    listen_conn: psycopg.Connection | None = None
+    pending_claimed = 0
+    last_claim_log = time.monotonic()
 
-    while True:
-        try:
-            n = claim_and_enqueue_due_tasks()
-            if n:
-                # Keep logging lightweight; in real systems use structured logging.
-                print(f"[scheduler] claimed+enqueued={n} at {_utcnow().isoformat()}")
-
-            # Reset backoff after a successful tick.
-            backoff_seconds = DB_ERROR_BACKOFF_MIN_SECONDS
-            _sleep_with_jitter(POLL_SECONDS)
-
-        except (OperationalError,) as e:
-            # DB temporarily unavailable (startup, network hiccup, etc.).
-            # Backoff to reduce log noise and avoid hammering the DB.
-            print(f"[scheduler] DB OperationalError: {e!r} (backing off {backoff_seconds}s)")
-            _sleep_with_jitter(backoff_seconds)
-            backoff_seconds = min(DB_ERROR_BACKOFF_MAX_SECONDS, backoff_seconds * 2)
-
-        except (ProgrammingError,) as e:
-            # Typically indicates schema mismatch / migrations not applied yet.
-            # Keep process alive and retry; this often resolves after `alembic upgrade head`.
-            print(f"[scheduler] DB ProgrammingError: {e!r} (did you run migrations?)")
-            _sleep_with_jitter(max(POLL_SECONDS, 3))
-
-        except Exception as e:
-            # Unknown error: keep scheduler alive.
-            print(f"[scheduler] ERROR: {e!r}")
-            _sleep_with_jitter(POLL_SECONDS)
+    try:
+        while True:
+            try:
+                # LISTEN before claiming so nothing scheduled after the claim is missed.
+                if listen_conn is None or listen_conn.closed:
+                    listen_conn = _listen_connection()
+
+                n = claim_and_enqueue_due_tasks()
+
+                # Reset backoff after a successful tick.
+                backoff_seconds = DB_ERROR_BACKOFF_MIN_SECONDS
+
+                # A full batch means more may already be due: go again right away.
+                backlog = n >= BATCH_SIZE
+
+                # Summarize claims; flush before going idle so nothing lingers.
+                pending_claimed += n
+                now_mono = time.monotonic()
+                if pending_claimed and (
+                    not backlog or now_mono - last_claim_log >= CLAIM_LOG_INTERVAL_SECONDS
+                ):
+                    logger.info("claimed+enqueued=%d", pending_claimed)
+                    pending_claimed = 0
+                    last_claim_log = now_mono
+
+                if backlog:
+                    continue
+                _wait_for_work(listen_conn, _seconds_until_next_due())
+
+            except (OperationalError, psycopg.OperationalError) as e:
+                # DB temporarily unavailable (startup, network hiccup, etc.).
+                # Backoff to reduce log noise and avoid hammering the DB.
+                logger.warning("DB OperationalError: %r (backing off %ss)", e, backoff_seconds)
+                if listen_conn is not None:
+                    listen_conn.close()
+                    listen_conn = None
+                _sleep_with_jitter(backoff_seconds)
+                backoff_seconds = min(DB_ERROR_BACKOFF_MAX_SECONDS, backoff_seconds * 2)
+
+            except (ProgrammingError,) as e:
+                # Typically indicates schema mismatch / migrations not applied yet.
+                # Keep process alive and retry; this often resolves after `alembic upgrade head`.
+                logger.error("DB ProgrammingError: %r (did you run migrations?)", e)
+                _sleep_with_jitter(max(POLL_SECONDS, 3))
+
+            except Exception:
+                # Unknown error: keep scheduler alive.
+                logger.exception("unexpected error")
+                _sleep_with_jitter(POLL_SECONDS)
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
@@ -51,16 +51,16 @@ class TaskChainCreate(BaseModel):
     )
 
 
-class TaskOut(BaseModel):
+class TaskSummaryOut(BaseModel):
     """
-    API response model representing a Task.
+    API response model for task list views.
 
-    This mirrors the DB entity closely so the frontend can render:
-    - status, timestamps, outputs, errors, provider/model metadata, retry info, and parent linkage.
+    Everything the list UI renders, minus the large TEXT columns
+    (`prompt`, `output`, `error`). Those usually live in Postgres TOAST storage,
+    so skipping them keeps list pages from paying detoast I/O per row.
     """
     id: uuid.UUID
     name: str
-    prompt: str
     status: TaskStatus
 
     scheduled_for: Optional[datetime]
@@ -68,9 +68,6 @@ class TaskOut(BaseModel):
     started_at: Optional[datetime]
     finished_at: Optional[datetime]
 
-    output: Optional[str]
-    error: Optional[str]
-
     parent_task_id: Optional[uuid.UUID]
 
     llm_provider: Optional[str]
@@ -82,10 +79,22 @@ class TaskOut(BaseModel):
     max_attempts: int
 
     class Config:
-        # Allow `TaskOut.model_validate(sqlalchemy_task)` style conversion from ORM objects.
+        # Allow `TaskSummaryOut.model_validate(sqlalchemy_task)` style conversion from ORM objects.
         from_attributes = True
 
 
+class TaskOut(TaskSummaryOut):
+    """
+    API response model representing a Task.
+
+    This mirrors the DB entity closely so the frontend can render:
+    - status, timestamps, outputs, errors, provider/model metadata, retry info, and parent linkage.
+    """
+    prompt: str
+    output: Optional[str]
+    error: Optional[str]
+
+
 class TaskRetryRequest(BaseModel):
     """
     Optional request body for retrying a task.
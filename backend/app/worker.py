@@ -1,8 +1,19 @@
 # backend/app/worker.py
 
-from redis import Redis
+from redis import ConnectionPool, Redis
 from rq import Queue
 from app.settings import settings
 
-redis_conn = Redis.from_url(settings.redis_url)
+# One bounded pool per process (API, scheduler, work horses). Without a cap,
+# redis-py opens a socket per concurrent caller on demand; with hiredis
+# installed it also parses replies in C.
+REDIS_MAX_CONNECTIONS = 64
+
+redis_pool = ConnectionPool.from_url(
+    settings.redis_url,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    socket_keepalive=True,
+    socket_timeout=2,
+)
+redis_conn = Redis(connection_pool=redis_pool)
 queue = Queue("tasks", connection=redis_conn)
@@ -1,30 +1,58 @@
 from __future__ import annotations
 
+import shutil
 import sys
-from collections.abc import Generator
+import uuid
+from collections.abc import Callable, Generator
 from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 
 # Ensure `backend/app` is importable as `app` when tests run in container.
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app.db import get_db
 from app.main import app
-from app.models import Base
+from app.models import Base, Task, TaskStatus
+
+
+@pytest.fixture(scope="session")
+def schema_template(tmp_path_factory) -> Path:
+    """
+    SQLite file with the schema already created, built once per session.
+    Tests copy it instead of re-running the DDL.
+    """
+    template = tmp_path_factory.mktemp("schema") / "template.db"
+    engine = create_engine(f"sqlite+pysqlite:///{template}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return template
 
 
 @pytest.fixture()
-def db_session_factory(tmp_path) -> Generator[sessionmaker, None, None]:
+def db_session_factory(tmp_path, schema_template) -> Generator[sessionmaker, None, None]:
+    # A fresh copy of the template per test: isolated rows, no DDL.
     db_file = tmp_path / "test.db"
+    shutil.copyfile(schema_template, db_file)
     engine = create_engine(
         f"sqlite+pysqlite:///{db_file}",
         connect_args={"check_same_thread": False, "timeout": 30},
     )
-    Base.metadata.create_all(engine)
+
+    # RAM-speed commits without sharing a connection: a StaticPool :memory:
+    # DB would hand every thread the same connection (and transaction),
+    # hollowing out the concurrent-claim tests. A throwaway file DB with no
+    # fsync and an in-memory rollback journal keeps one connection per thread.
+    @event.listens_for(engine, "connect")
+    def _fast_sqlite(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA journal_mode = MEMORY")
+        cursor.close()
+
     factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
     try:
         yield factory
@@ -32,6 +60,44 @@ def db_session_factory(tmp_path) -> Generator[sessionmaker, None, None]:
         engine.dispose()
 
 
+@pytest.fixture()
+def shared_session(db_session_factory) -> Generator[scoped_session, None, None]:
+    """
+    One session per test thread for setup + assertions.
+
+    Call it (`db = shared_session()`) instead of opening a fresh
+    `with db_session_factory()` block per step. The registry is thread-local,
+    so code under test running in other threads never shares it. Objects
+    already loaded are refreshed only after this session commits (or
+    expire_all()), so load rows after the code under test has written them.
+    """
+    registry = scoped_session(db_session_factory)
+    try:
+        yield registry
+    finally:
+        registry.remove()
+
+
+@pytest.fixture()
+def make_queued_task(db_session_factory) -> Callable[..., uuid.UUID]:
+    """
+    Insert a queued task and return its id: `make_queued_task(name=..., prompt=...)`.
+
+    Core INSERT ... RETURNING, so no ORM instance/identity-map state is built.
+    Keyword arguments are column values and may override `status`.
+    """
+
+    def _make(**values) -> uuid.UUID:
+        with db_session_factory() as db:
+            task_id = db.execute(
+                insert(Task).values({"status": TaskStatus.queued, **values}).returning(Task.id)
+            ).scalar_one()
+            db.commit()
+        return task_id
+
+    return _make
+
+
 @pytest.fixture()
 def queue_spy(monkeypatch) -> list[tuple]:
     calls: list[tuple] = []
@@ -40,15 +106,20 @@ def queue_spy(monkeypatch) -> list[tuple]:
         calls.append((fn, args, kwargs))
         return None
 
-    monkeypatch.setattr("app.main.queue.enqueue", fake_enqueue)
+    def fake_enqueue_many(job_datas, *args, **kwargs):
+        for job_data in job_datas:
+            calls.append((job_data.func, job_data.args, job_data.kwargs))
+        return []
+
     monkeypatch.setattr("app.jobs.queue.enqueue", fake_enqueue)
+    monkeypatch.setattr("app.jobs.queue.enqueue_many", fake_enqueue_many)
     return calls
 
 
 @pytest.fixture()
 def client(db_session_factory, monkeypatch, queue_spy) -> Generator[TestClient, None, None]:
     def override_get_db():
-        db: Session = db_session_factory()
+        db: Session = db_session_factory(expire_on_commit=False)
         try:
             yield db
         finally:
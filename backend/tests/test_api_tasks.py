@@ -89,3 +89,80 @@ def test_cancel_endpoint_is_idempotent(client, db_session_factory):
 def test_get_task_invalid_uuid_returns_422(client):
     response = client.get("/tasks/not-a-uuid")
     assert response.status_code == 422
+
+
+def test_list_tasks_returns_summaries_without_text_columns(client, db_session_factory):
+    with db_session_factory() as db:
+        db.add(Task(name="listed", prompt="big prompt", status=TaskStatus.completed, output="big output"))
+        db.commit()
+
+    response = client.get("/tasks")
+    assert response.status_code == 200
+    [item] = response.json()
+    assert item["name"] == "listed"
+    assert item["status"] == TaskStatus.completed.value
+    assert "prompt" not in item
+    assert "output" not in item
+    assert "error" not in item
+
+
+def test_chain_enqueues_only_immediate_children(client, db_session_factory, queue_spy):
+    with db_session_factory() as db:
+        parent = Task(name="parent", prompt="p", status=TaskStatus.completed, output="parent output")
+        db.add(parent)
+        db.commit()
+        db.refresh(parent)
+        parent_id = str(parent.id)
+
+    # Naive datetimes are treated as UTC.
+    later = (datetime.now(timezone.utc) + timedelta(minutes=10)).replace(tzinfo=None).isoformat()
+    scheduled = client.post(
+        f"/tasks/{parent_id}/chain",
+        json={"name": "later child", "instruction": "summarize", "scheduled_for": later},
+    )
+    assert scheduled.status_code == 200
+    assert scheduled.json()["status"] == TaskStatus.scheduled.value
+    assert scheduled.json()["parent_task_id"] == parent_id
+    assert len(queue_spy) == 0
+
+    immediate = client.post(
+        f"/tasks/{parent_id}/chain",
+        json={"name": "now child", "instruction": "summarize"},
+    )
+    assert immediate.status_code == 200
+    assert immediate.json()["status"] == TaskStatus.queued.value
+    assert len(queue_spy) == 1
+    _, args, _ = queue_spy[0]
+    assert args[0] == immediate.json()["id"]
+
+
+def test_list_tasks_keyset_pagination(client, db_session_factory):
+    base = datetime(2026, 1, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    with db_session_factory() as db:
+        # Two tasks share a created_at to exercise the id tie-break.
+        for i, offset_s in enumerate([0, 1, 1, 2, 3]):
+            created_at = base + timedelta(seconds=offset_s)
+            db.add(Task(name=f"t{i}", prompt="p", status=TaskStatus.queued, created_at=created_at))
+        db.commit()
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/tasks", params=params)
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    full = [item["id"] for item in client.get("/tasks", params={"limit": 200}).json()]
+    assert len(full) == 5
+    assert seen == full
+
+
+def test_list_tasks_invalid_cursor_returns_400(client):
+    response = client.get("/tasks", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import httpx
+import orjson
+import pytest
+
+from app.llm import MockLLMClient, OpenAILLMClient, get_llm_client, reset_llm_client
+
+
+@pytest.fixture()
+def fresh_llm_cache():
+    """Clear get_llm_client()'s per-process cache around a test."""
+    reset_llm_client()
+    yield
+    reset_llm_client()
+
+
+def _sse(*events: str) -> bytes:
+    return "".join(f"{event}\n\n" for event in events).encode()
+
+
+def _delta(content: str | None) -> str:
+    delta = {} if content is None else {"content": content}
+    return "data: " + orjson.dumps({"choices": [{"delta": delta}]}).decode()
+
+
+@pytest.fixture()
+def openai_requests(monkeypatch) -> list[httpx.Request]:
+    """Serve OpenAI streaming calls from a canned SSE body; returns the requests seen."""
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = _sse(
+            ": keep-alive",
+            _delta("Hello"),
+            'data: {"choices": []}',
+            _delta(None),
+            _delta(" world"),
+            "data: [DONE]",
+            _delta(" after done"),
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    monkeypatch.setattr("app.llm._HTTP", httpx.Client(transport=httpx.MockTransport(handler)))
+    return requests
+
+
+def test_openai_stream_parses_sse_until_done(openai_requests):
+    client = OpenAILLMClient(api_key="sk-test", model="test-model")
+
+    assert list(client.stream("hi")) == ["Hello", " world"]
+
+    [request] = openai_requests
+    assert request.headers["authorization"] == "Bearer sk-test"
+    payload = orjson.loads(request.content)
+    assert payload["model"] == "test-model"
+    assert payload["stream"] is True
+    assert payload["messages"] == [{"role": "user", "content": "hi"}]
+
+
+def test_openai_generate_joins_stream(openai_requests):
+    client = OpenAILLMClient(api_key="sk-test", model="test-model")
+
+    assert client.generate("hi") == "Hello world"
+
+
+def test_get_llm_client_is_cached_per_provider_and_model(fresh_llm_cache, monkeypatch):
+    monkeypatch.setattr("app.llm.settings.llm_provider", "mock")
+
+    first = get_llm_client()
+    assert isinstance(first, MockLLMClient)
+    assert get_llm_client() is first
+
+    reset_llm_client()
+    assert get_llm_client() is not first
+
+    monkeypatch.setattr("app.llm.settings.llm_provider", "openai")
+    monkeypatch.setattr("app.llm.settings.openai_api_key", "sk-test")
+    monkeypatch.setattr("app.llm.settings.openai_model", "other-model")
+    openai = get_llm_client()
+    assert isinstance(openai, OpenAILLMClient)
+    assert openai.model == "other-model"
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import time
+import uuid
+
+from app.models import uuid7
+
+
+def test_uuid7_sets_version_and_variant():
+    value = uuid7()
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    # Leading 48 bits are the Unix timestamp in milliseconds.
+    assert abs((value.int >> 80) - time.time_ns() // 1_000_000) < 1000
+
+
+def test_uuid7_sorts_in_creation_order():
+    # Many fall in the same millisecond, where only the counter orders them.
+    ids = [uuid7() for _ in range(2000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(value.version == 7 and value.variant == uuid.RFC_4122 for value in ids)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import scheduler
+from app.crud import create_task
+from app.models import Task, TaskStatus
+
+
+@pytest.fixture()
+def scheduler_db(db_session_factory, monkeypatch):
+    """Point the scheduler's Core engine at the per-test database."""
+    monkeypatch.setattr("app.scheduler.engine", db_session_factory.kw["bind"])
+
+
+def _in(seconds: float) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+def _add_task(db_session_factory, **values) -> uuid.UUID:
+    with db_session_factory() as db:
+        task = Task(name="t", prompt="p", **values)
+        db.add(task)
+        db.commit()
+        return task.id
+
+
+def test_seconds_until_next_due_without_scheduled_tasks_waits_max(scheduler_db, db_session_factory):
+    _add_task(db_session_factory, status=TaskStatus.queued)
+
+    assert scheduler._seconds_until_next_due() == scheduler.POLL_SECONDS_MAX
+
+
+@pytest.mark.parametrize(
+    ("due_in", "low", "high"),
+    [
+        (24 * 3600, scheduler.POLL_SECONDS_MAX, scheduler.POLL_SECONDS_MAX),
+        (10, 5, 10),
+        # Overdue (e.g. rows locked by another scheduler): floored, not 0.
+        (-60, scheduler.POLL_SECONDS_MIN, scheduler.POLL_SECONDS_MIN),
+    ],
+    ids=["capped", "until_due", "floored"],
+)
+def test_seconds_until_next_due(scheduler_db, db_session_factory, due_in, low, high):
+    # SQLite hands scheduled_for back naive; it must be read as UTC.
+    _add_task(db_session_factory, status=TaskStatus.scheduled, scheduled_for=_in(due_in))
+
+    assert low <= scheduler._seconds_until_next_due() <= high
+
+
+def test_claim_enqueues_only_due_scheduled_tasks(scheduler_db, db_session_factory, queue_spy):
+    due_id = _add_task(db_session_factory, status=TaskStatus.scheduled, scheduled_for=_in(-5))
+    future_id = _add_task(db_session_factory, status=TaskStatus.scheduled, scheduled_for=_in(600))
+    cancelled_id = _add_task(db_session_factory, status=TaskStatus.cancelled, scheduled_for=_in(-5))
+
+    assert scheduler.claim_and_enqueue_due_tasks() == 1
+    assert [args[0] for _, args, _ in queue_spy] == [str(due_id)]
+
+    with db_session_factory() as db:
+        assert db.get(Task, due_id).status == TaskStatus.queued
+        assert db.get(Task, future_id).status == TaskStatus.scheduled
+        assert db.get(Task, cancelled_id).status == TaskStatus.cancelled
+
+    # Already claimed: a second tick finds nothing.
+    assert scheduler.claim_and_enqueue_due_tasks() == 0
+    assert len(queue_spy) == 1
+
+
+@pytest.mark.parametrize(
+    ("due_in", "notified"),
+    [(600, True), (None, False), (-5, False)],
+    ids=["future", "immediate", "past"],
+)
+def test_create_task_notifies_scheduler_only_when_scheduled(
+    db_session_factory,
+    monkeypatch,
+    due_in,
+    notified,
+):
+    calls = []
+    monkeypatch.setattr("app.crud._notify_scheduler", calls.append)
+
+    with db_session_factory() as db:
+        create_task(db, "t", "p", None if due_in is None else _in(due_in))
+
+    assert bool(calls) is notified
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
 import threading
-import time
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from app.jobs import execute_task
+import pytest
+
+from sqlalchemy import update
+
+from app.jobs import CANCEL_CHECK_EVERY_CHUNKS, execute_task
 from app.models import Task, TaskStatus
 
+# Upper bound on any cross-thread wait. These only elapse when a test is
+# failing; the happy path is released by Events and returns immediately.
+WAIT_SECONDS = 1.0
+
 
 class SuccessLLM:
     model = "test-model"
@@ -14,187 +23,286 @@ class SuccessLLM:
         return f"ok: {prompt}"
 
 
-def test_execute_task_completes_and_persists_metadata(db_session_factory, monkeypatch, queue_spy):
-    with db_session_factory() as db:
-        task = Task(name="worker success", prompt="hello", status=TaskStatus.queued)
-        db.add(task)
-        db.commit()
-        db.refresh(task)
-        task_id = task.id
-        task_id_str = str(task.id)
-
-    monkeypatch.setattr("app.jobs.SessionLocal", db_session_factory)
-    monkeypatch.setattr("app.jobs.get_llm_client", lambda: SuccessLLM())
-
-    execute_task(task_id_str)
-
-    with db_session_factory() as db:
-        saved = db.get(Task, task_id)
-        assert saved is not None
-        assert saved.status == TaskStatus.completed
-        assert saved.attempts == 1
-        assert saved.output == "ok: hello"
-        assert saved.error is None
-        assert saved.started_at is not None
-        assert saved.finished_at is not None
-        assert saved.llm_provider == "SuccessLLM"
-        assert saved.llm_model == "test-model"
-        assert saved.latency_ms is not None
-        assert saved.latency_ms >= 0
+class FailingLLM:
+    def generate(self, prompt: str) -> str:
+        raise RuntimeError("transient failure")
 
-    assert queue_spy == []
 
+class AlwaysFailLLM:
+    def generate(self, prompt: str) -> str:
+        raise RuntimeError("permanent failure")
+
+
+class BlockingLLM:
+    """
+    Holds generate() open until the test calls release().
+
+    One Condition guards both flags, so each side waits on an explicit
+    predicate (wait_for) and a wakeup can't be missed or taken for spurious.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._started = False
+        self._released = False
 
-def test_execute_task_requeues_when_attempts_remain(db_session_factory, monkeypatch, queue_spy):
-    class FailingLLM:
-        def generate(self, prompt: str) -> str:
-            raise RuntimeError("transient failure")
-
-    with db_session_factory() as db:
-        task = Task(
-            name="retry me",
-            prompt="fail once",
-            status=TaskStatus.queued,
-            attempts=0,
-            max_attempts=2,
-        )
-        db.add(task)
-        db.commit()
-        db.refresh(task)
-        task_id = task.id
-        task_id_str = str(task.id)
-
-    monkeypatch.setattr("app.jobs.SessionLocal", db_session_factory)
-    monkeypatch.setattr("app.jobs.get_llm_client", lambda: FailingLLM())
-
-    execute_task(task_id_str)
-
-    with db_session_factory() as db:
-        saved = db.get(Task, task_id)
-        assert saved is not None
-        assert saved.status == TaskStatus.queued
-        assert saved.attempts == 1
-        assert saved.error == "transient failure"
-        assert saved.finished_at is not None
-
-    assert len(queue_spy) == 1
-    _, args, _ = queue_spy[0]
-    assert args[0] == task_id_str
-
-
-def test_execute_task_marks_failed_when_attempts_exhausted(db_session_factory, monkeypatch, queue_spy):
-    class AlwaysFailLLM:
-        def generate(self, prompt: str) -> str:
-            raise RuntimeError("permanent failure")
-
-    with db_session_factory() as db:
-        task = Task(
-            name="fail hard",
-            prompt="no retry",
-            status=TaskStatus.queued,
-            attempts=0,
-            max_attempts=1,
-        )
-        db.add(task)
-        db.commit()
-        db.refresh(task)
-        task_id = task.id
-        task_id_str = str(task.id)
-
-    monkeypatch.setattr("app.jobs.SessionLocal", db_session_factory)
-    monkeypatch.setattr("app.jobs.get_llm_client", lambda: AlwaysFailLLM())
-
-    execute_task(task_id_str)
-
-    with db_session_factory() as db:
-        saved = db.get(Task, task_id)
-        assert saved is not None
-        assert saved.status == TaskStatus.failed
-        assert saved.attempts == 1
-        assert saved.error == "permanent failure"
+    def generate(self, prompt: str) -> str:
+        with self._cond:
+            self._started = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._released, timeout=WAIT_SECONDS)
+        return "should not be persisted"
+
+    def wait_started(self) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._started, timeout=WAIT_SECONDS)
+
+    def release(self) -> None:
+        with self._cond:
+            self._released = True
+            self._cond.notify_all()
+
+
+class CountingLLM:
+    """Counts generate() calls; each call waits for `proceed` before returning."""
+
+    model = "slow-model"
+
+    def __init__(self, proceed: threading.Event) -> None:
+        self.proceed = proceed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        self.proceed.wait(timeout=WAIT_SECONDS)
+        return "single run"
+
+
+class StreamingLLM:
+    """
+    Streams `total` chunks and calls `on_chunk(i)` before yielding chunk i.
+
+    Records how many chunks were consumed and whether the generator was closed.
+    """
+
+    def __init__(self, total: int, on_chunk) -> None:
+        self.total = total
+        self.on_chunk = on_chunk
+        self.yielded = 0
+        self.closed = False
+
+    def stream(self, prompt: str):
+        try:
+            for i in range(self.total):
+                self.on_chunk(i)
+                self.yielded += 1
+                yield "x"
+        finally:
+            self.closed = True
+
+
+@pytest.fixture(scope="module")
+def worker_pool() -> Generator[ThreadPoolExecutor, None, None]:
+    """
+    Threads for the concurrent tests, created once per module.
+
+    Two workers: the atomic-claim race needs both calls in flight at once.
+    Future.result() re-raises anything the worker raised, which a bare
+    threading.Thread would only print.
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_execute_task_completes_and_persists_metadata(
+    make_queued_task,
+    shared_session,
+    db_session_factory,
+    queue_spy,
+):
+    task_id = make_queued_task(name="worker success", prompt="hello")
+
+    result = execute_task(str(task_id), session_factory=db_session_factory, llm_factory=SuccessLLM)
+
+    assert result is not None
+    assert result.task_id == task_id
+    assert result.status == TaskStatus.completed
+    assert result.attempts == 1
+    assert result.output == "ok: hello"
+    assert result.error is None
+    assert result.started_at is not None
+    assert result.finished_at is not None
+    assert result.llm_provider == "SuccessLLM"
+    assert result.llm_model == "test-model"
+    assert result.latency_ms is not None
+    assert result.latency_ms >= 0
+
+    # The returned result must match what the finalize UPDATE persisted.
+    saved = shared_session().get(Task, task_id)
+    assert saved is not None
+    assert saved.status == result.status
+    assert saved.attempts == result.attempts
+    assert saved.output == result.output
+    assert saved.error is None
+    assert saved.started_at is not None
+    assert saved.finished_at is not None
+    assert saved.llm_provider == result.llm_provider
+    assert saved.llm_model == result.llm_model
+    assert saved.latency_ms == result.latency_ms
 
     assert queue_spy == []
 
 
-def test_execute_task_respects_mid_run_cancellation(db_session_factory, monkeypatch):
-    started = threading.Event()
-    release = threading.Event()
-
-    class BlockingLLM:
-        def generate(self, prompt: str) -> str:
-            started.set()
-            release.wait(timeout=5)
-            return "should not be persisted"
-
-    with db_session_factory() as db:
-        task = Task(name="cancel in flight", prompt="work", status=TaskStatus.queued)
-        db.add(task)
-        db.commit()
-        db.refresh(task)
-        task_id = task.id
-        task_id_str = str(task.id)
-
-    monkeypatch.setattr("app.jobs.SessionLocal", db_session_factory)
-    monkeypatch.setattr("app.jobs.get_llm_client", lambda: BlockingLLM())
-
-    worker_thread = threading.Thread(target=execute_task, args=(task_id_str,))
-    worker_thread.start()
-
-    assert started.wait(timeout=5)
-    with db_session_factory() as db:
-        task = db.get(Task, task_id)
-        assert task is not None
-        task.status = TaskStatus.cancelled
-        db.commit()
-
-    release.set()
-    worker_thread.join(timeout=5)
-    assert not worker_thread.is_alive()
-
-    with db_session_factory() as db:
-        saved = db.get(Task, task_id)
-        assert saved is not None
-        assert saved.status == TaskStatus.cancelled
-        assert saved.output is None
-        assert saved.finished_at is not None
-
-
-def test_execute_task_atomic_claim_prevents_double_run(db_session_factory, monkeypatch):
-    lock = threading.Lock()
-    calls = {"count": 0}
-
-    class SlowLLM:
-        model = "slow-model"
-
-        def generate(self, prompt: str) -> str:
-            with lock:
-                calls["count"] += 1
-            time.sleep(0.15)
-            return "single run"
-
-    with db_session_factory() as db:
-        task = Task(name="race", prompt="once", status=TaskStatus.queued)
-        db.add(task)
-        db.commit()
-        db.refresh(task)
-        task_id = task.id
-        task_id_str = str(task.id)
-
-    monkeypatch.setattr("app.jobs.SessionLocal", db_session_factory)
-    monkeypatch.setattr("app.jobs.get_llm_client", lambda: SlowLLM())
-
-    t1 = threading.Thread(target=execute_task, args=(task_id_str,))
-    t2 = threading.Thread(target=execute_task, args=(task_id_str,))
-    t1.start()
-    t2.start()
-    t1.join(timeout=5)
-    t2.join(timeout=5)
-
-    with db_session_factory() as db:
-        saved = db.get(Task, task_id)
-        assert saved is not None
-        assert saved.status == TaskStatus.completed
-        assert saved.attempts == 1
-        assert saved.output == "single run"
-
-    assert calls["count"] == 1
+@pytest.mark.parametrize(
+    ("llm_cls", "max_attempts", "final_status", "error", "requeued"),
+    [
+        (FailingLLM, 2, TaskStatus.queued, "transient failure", True),
+        (AlwaysFailLLM, 1, TaskStatus.failed, "permanent failure", False),
+    ],
+    ids=["requeues_when_attempts_remain", "fails_when_attempts_exhausted"],
+)
+def test_execute_task_failure_outcomes(
+    make_queued_task,
+    shared_session,
+    db_session_factory,
+    queue_spy,
+    llm_cls,
+    max_attempts,
+    final_status,
+    error,
+    requeued,
+):
+    task_id = make_queued_task(name="fails", prompt="boom", attempts=0, max_attempts=max_attempts)
+    task_id_str = str(task_id)
+
+    result = execute_task(task_id_str, session_factory=db_session_factory, llm_factory=llm_cls)
+
+    assert result is not None
+    assert result.status == final_status
+    assert result.attempts == 1
+    assert result.error == error
+    assert result.finished_at is not None
+
+    saved = shared_session().get(Task, task_id)
+    assert saved is not None
+    assert (saved.status, saved.attempts, saved.error) == (final_status, 1, error)
+
+    if requeued:
+        assert len(queue_spy) == 1
+        _, args, _ = queue_spy[0]
+        assert args[0] == task_id_str
+    else:
+        assert queue_spy == []
+
+
+def test_execute_task_respects_mid_run_cancellation(
+    make_queued_task,
+    shared_session,
+    db_session_factory,
+    worker_pool,
+):
+    llm = BlockingLLM()
+    task_id = make_queued_task(name="cancel in flight", prompt="work")
+    db = shared_session()
+
+    future = worker_pool.submit(
+        execute_task, str(task_id), session_factory=db_session_factory, llm_factory=lambda: llm
+    )
+
+    assert llm.wait_started()
+    task = db.get(Task, task_id)
+    assert task is not None
+    task.status = TaskStatus.cancelled
+    db.commit()
+
+    # Released only after the cancel is committed, so the worker's finishing
+    # UPDATE always sees it.
+    llm.release()
+    result = future.result(timeout=WAIT_SECONDS)
+    assert result is not None
+    assert result.status == TaskStatus.cancelled
+
+    # Expired by the commit above, so this reloads the worker's final write.
+    saved = db.get(Task, task_id)
+    assert saved is not None
+    assert saved.status == TaskStatus.cancelled
+    assert saved.output is None
+    assert saved.finished_at is not None
+
+
+def test_execute_task_stops_streaming_on_cancellation(
+    make_queued_task,
+    shared_session,
+    db_session_factory,
+):
+    task_id = make_queued_task(name="stream", prompt="long answer")
+
+    def cancel_at(i: int) -> None:
+        # Cancel from "another request" partway into the first check window.
+        if i == CANCEL_CHECK_EVERY_CHUNKS // 2:
+            with db_session_factory() as other:
+                other.execute(
+                    update(Task).where(Task.id == task_id).values(status=TaskStatus.cancelled)
+                )
+                other.commit()
+
+    llm = StreamingLLM(total=4 * CANCEL_CHECK_EVERY_CHUNKS, on_chunk=cancel_at)
+
+    result = execute_task(str(task_id), session_factory=db_session_factory, llm_factory=lambda: llm)
+
+    # Stopped at the first cancellation check, and the stream was closed.
+    assert llm.yielded == CANCEL_CHECK_EVERY_CHUNKS
+    assert llm.closed
+    assert result is not None
+    assert result.status == TaskStatus.cancelled
+
+    saved = shared_session().get(Task, task_id)
+    assert saved is not None
+    assert saved.status == TaskStatus.cancelled
+    assert saved.output is None
+    assert saved.finished_at is not None
+
+
+def test_execute_task_atomic_claim_prevents_double_run(
+    make_queued_task,
+    shared_session,
+    db_session_factory,
+    worker_pool,
+):
+    # Set when either execute_task call returns. The claim winner blocks in
+    # generate() until then, i.e. until the loser has tried and missed the claim.
+    other_returned = threading.Event()
+    llm = CountingLLM(proceed=other_returned)
+    # Release both threads into execute_task together, so the two claims race
+    # rather than running in thread start order.
+    start_together = threading.Barrier(2)
+
+    def run():
+        start_together.wait(timeout=WAIT_SECONDS)
+        try:
+            return execute_task(
+                task_id_str, session_factory=db_session_factory, llm_factory=lambda: llm
+            )
+        finally:
+            other_returned.set()
+
+    task_id = make_queued_task(name="race", prompt="once")
+    db = shared_session()
+    task_id_str = str(task_id)
+
+    futures = [worker_pool.submit(run), worker_pool.submit(run)]
+    _, not_done = wait(futures, timeout=2 * WAIT_SECONDS)
+    assert not not_done
+    # Exactly one call claimed the task; the other was a no-op.
+    results = [future.result() for future in futures]
+    assert sum(result is not None for result in results) == 1
+
+    saved = db.get(Task, task_id)
+    assert saved is not None
+    assert saved.status == TaskStatus.completed
+    assert saved.attempts == 1
+    assert saved.output == "single run"
+
+    assert llm.calls == 1